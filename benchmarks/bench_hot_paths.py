@@ -0,0 +1,321 @@
+"""Microbenchmarks for the pure-Python code run on every poll and state read.
+
+Runs against a mocked ViomiVacuum, so no robot is needed, but Home
+Assistant and python-miio must be importable. Device calls run inline
+instead of on the device executor so only the integration's own code is
+measured.
+
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --save baseline.json
+    python benchmarks/bench_hot_paths.py --baseline baseline.json --threshold 0.2
+
+With --baseline the script exits with status 1 if any operation got slower
+or allocated more than the baseline by more than the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.viomise import job_queue, vacuum  # noqa: E402
+from custom_components.viomise.const import DOMAIN  # noqa: E402
+from custom_components.viomise.events import diff_snapshots  # noqa: E402
+from custom_components.viomise.sensor import XiaomiVacuumBatterySensor  # noqa: E402
+
+DEFAULT_ENTITY_COUNTS = (1, 10, 50, 200)
+DEFAULT_ROUNDS = 50
+
+# Allocation growth below this many bytes per entity is noise, not a regression
+ALLOC_TOLERANCE_BYTES = 64
+
+METRICS = (
+    # (result key, display unit, divisor for display)
+    ("ns_per_entity", "us", 1000),
+    ("peak_bytes_per_entity", "B", 1),
+)
+
+# A docked robot with a dust box, so update() never switches the mop mode
+SAMPLE_STATE = {
+    "run_state": 5,
+    "mode": 0,
+    "err_state": 2103,
+    "battary_life": 87,
+    "box_type": 1,
+    "mop_type": 0,
+    "s_time": 42,
+    "s_area": 37,
+    "suction_grade": 1,
+    "water_grade": 11,
+    "remember_map": 1,
+    "has_map": 1,
+    "is_mop": 0,
+    "has_newmap": 0,
+    "side_brush_life": 71,
+    "side_brush_hours": 58,
+    "main_brush_life": 83,
+    "main_brush_hours": 248,
+    "hypa_life": 64,
+    "hypa_hours": 54,
+    "mop_life": 0,
+    "mop_hours": 0,
+    "water_percent": 0,
+    "hw_info": "1.0.1",
+    "sw_info": "3.5.3_0017",
+    "start_time": 0,
+    "order_time": "0",
+    "v_state": 10,
+    "zone_data": "0",
+    "repeat_state": 0,
+    "light_state": 1,
+    "is_charge": 0,
+    "is_work": 0,
+    "cur_mapid": 1614180588,
+    "mop_route": 1,
+    "map_num": 1,
+}
+SAMPLE_PROPS = [SAMPLE_STATE[prop] for prop in vacuum.ALL_PROPS]
+
+SAMPLE_ZONES = [[-1.5, -1.0, 2.0, 2.5], [0.0, 0.5, 3.0, 4.0], [-4.0, -3.0, -1.0, 0.0]]
+
+
+class FakeViomiVacuum:
+    """Stand-in for miio's ViomiVacuum answering every call locally."""
+
+    def __init__(self, ip, token):
+        """Initialize the fake device."""
+        self.ip = ip
+        self.token = token
+
+    def raw_command(self, command, parameters=None):
+        """Return the sample state for get_prop and success otherwise."""
+        if command == 'get_prop':
+            return SAMPLE_PROPS
+        return ['ok']
+
+
+class FakeStore:
+    """Stand-in for the job queue Store that never touches disk."""
+
+    def __init__(self, hass, version, key):
+        """Initialize the fake store."""
+
+    async def async_load(self):
+        """Return no persisted queue."""
+        return None
+
+    def async_delay_save(self, data_func, delay):
+        """Drop the save."""
+
+
+class InlineExecutor:
+    """Device executor that runs jobs on the calling thread."""
+
+    async def async_add_job(self, hass, func, *args, **kwargs):
+        """Run the job immediately."""
+        return func(*args, **kwargs)
+
+
+async def _async_noop(*args, **kwargs):
+    """Do nothing, in place of writing entity state to Home Assistant."""
+
+
+async def async_create_fleet(loop, count):
+    """Set up count vacuums and return them with the service handler."""
+    hass = SimpleNamespace(loop=loop, data={DOMAIN: {}}, services=SimpleNamespace())
+    handlers = {}
+    entities = []
+    hass.services.async_register = (
+        lambda domain, service, handler, schema=None: handlers.setdefault(service, handler)
+    )
+    for index in range(count):
+        config_entry = SimpleNamespace(
+            entry_id=f"entry{index}",
+            data={
+                vacuum.CONF_HOST: f"192.168.{index // 250}.{index % 250 + 1}",
+                vacuum.CONF_TOKEN: f"{index:032x}",
+                vacuum.CONF_NAME: f"Vacuum {index}",
+            },
+        )
+        await vacuum.async_setup_entry(
+            hass, config_entry, lambda new_entities, update_before_add=False: entities.extend(new_entities)
+        )
+    for index, entity in enumerate(entities):
+        entity.hass = hass
+        entity.entity_id = f"vacuum.vacuum_{index}"
+        entity.executor = InlineExecutor()
+        entity.update()
+    return hass, entities, handlers[vacuum.SERVICE_CLEAN_SEGMENT]
+
+
+def build_operations(loop, entities, service_handler):
+    """Return (name, setup, run) for each measured operation."""
+    sensors = [XiaomiVacuumBatterySensor(entity) for entity in entities]
+    entity_ids = [entity.entity_id for entity in entities]
+    service = SimpleNamespace(
+        service=vacuum.SERVICE_CLEAN_SEGMENT,
+        data={vacuum.ATTR_ENTITY_ID: entity_ids, vacuum.ATTR_SEGMENTS: [10, 11]},
+    )
+    previous = {}
+
+    def poll():
+        """Take a new snapshot, dropping the cached derived values."""
+        for entity in entities:
+            previous[entity] = entity.snapshot
+            entity.update()
+
+    def run_update():
+        for entity in entities:
+            entity.update()
+
+    def run_attributes():
+        for entity in entities:
+            entity.extra_state_attributes
+
+    def run_activity_fan_speed():
+        for entity in entities:
+            entity.activity
+            entity.fan_speed
+
+    def run_sensor():
+        for sensor in sensors:
+            sensor.icon
+            sensor.extra_state_attributes
+
+    def run_transitions():
+        for entity in entities:
+            diff_snapshots(previous[entity], entity.snapshot)
+
+    def poll_and_read():
+        """Take a new snapshot and read it once, as the first state write does."""
+        poll()
+        run_attributes()
+        run_activity_fan_speed()
+        run_sensor()
+
+    def run_clean_zone():
+        loop.run_until_complete(asyncio.gather(*(
+            entity.async_clean_zone(SAMPLE_ZONES, repeats=2) for entity in entities
+        )))
+
+    def run_service_dispatch():
+        loop.run_until_complete(service_handler(service))
+
+    return [
+        ("update", None, run_update),
+        ("extra_state_attributes", poll, run_attributes),
+        ("activity_fan_speed", poll, run_activity_fan_speed),
+        ("battery_sensor", poll, run_sensor),
+        ("extra_state_attributes_reread", poll_and_read, run_attributes),
+        ("activity_fan_speed_reread", poll_and_read, run_activity_fan_speed),
+        ("battery_sensor_reread", poll_and_read, run_sensor),
+        ("transition_diff", poll, run_transitions),
+        ("clean_zone_payload", None, run_clean_zone),
+        ("service_dispatch", None, run_service_dispatch),
+    ]
+
+
+def measure(setup, run, count, rounds):
+    """Return median time and peak allocation per entity for one operation."""
+    timings = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        run()
+        timings.append(time.perf_counter_ns() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ns_per_entity": statistics.median(timings) / count,
+        "peak_bytes_per_entity": peak / count,
+    }
+
+
+def run_benchmarks(entity_counts, rounds):
+    """Run every operation for each fleet size and return the results."""
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        with patch.object(vacuum, "ViomiVacuum", FakeViomiVacuum), \
+                patch.object(job_queue, "Store", FakeStore), \
+                patch.object(vacuum.MiroboVacuum2, "async_update_ha_state", _async_noop):
+            for count in entity_counts:
+                _, entities, service_handler = loop.run_until_complete(
+                    async_create_fleet(loop, count))
+                for name, setup, run in build_operations(loop, entities, service_handler):
+                    results[f"{name}[{count}]"] = measure(setup, run, count, rounds)
+    finally:
+        loop.close()
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Return the operations slower or allocating more than the baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, unit, divisor in METRICS:
+            before = baseline[key][metric]
+            limit = before * (1 + threshold)
+            if metric == "peak_bytes_per_entity":
+                limit = max(limit, before + ALLOC_TOLERANCE_BYTES)
+            if result[metric] > limit:
+                regressions.append(
+                    (key, metric, before / divisor, result[metric] / divisor, unit))
+    return regressions
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--entities", default=",".join(str(count) for count in DEFAULT_ENTITY_COUNTS),
+        help="comma separated fleet sizes to benchmark")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="timed rounds per operation")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline, 0.2 is 20%%")
+    args = parser.parse_args()
+
+    entity_counts = [int(count) for count in args.entities.split(",")]
+    results = run_benchmarks(entity_counts, args.rounds)
+
+    print(f"{'operation':<34}{'time/entity':>14}{'peak alloc/entity':>20}")
+    for key, result in results.items():
+        print(f"{key:<34}{result['ns_per_entity'] / 1000:>11.2f} us"
+              f"{result['peak_bytes_per_entity']:>18.0f} B")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for key, metric, before, after, unit in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.2f} {unit} -> {after:.2f} {unit}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
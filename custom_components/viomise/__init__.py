@@ -18,5 +18,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        vacuum = hass.data[DOMAIN].pop(entry.entry_id)
+        # Let in-flight device calls finish before the worker thread exits
+        if (executor := getattr(vacuum, "executor", None)) is not None:
+            await hass.async_add_executor_job(executor.shutdown)
     return unload_ok
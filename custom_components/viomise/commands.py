@@ -0,0 +1,118 @@
+"""Parameter parsing and validation for raw Viomi commands."""
+import ast
+from functools import lru_cache
+import json
+import re
+
+# Number of parameters accepted by known commands as (min, max); None is unbounded.
+# Commands missing from the table are sent unvalidated.
+COMMAND_ARITIES = {
+    'get_prop': (1, None),
+    'set_mode': (1, 2),
+    'set_mode_withroom': (3, None),
+    'set_pointclean': (3, 3),
+    'set_zone': (1, None),
+    'set_uploadmap': (1, 1),
+    'set_suction': (1, 1),
+    'set_mop': (1, 1),
+    'set_charge': (1, 1),
+    'set_resetpos': (1, 1),
+    'set_repeat': (1, 1),
+    'set_light': (1, 1),
+    'set_language': (1, 1),
+    'set_remember': (1, 1),
+    'set_moproute': (1, 1),
+    'set_carpetturbo': (1, 1),
+}
+
+# Rendered lists are parsed as literals; other strings are only converted
+# when they are plain int or float text and are sent unchanged otherwise
+LIST_PREFIX = '['
+INT_PATTERN = re.compile(r'-?[0-9]+')
+FLOAT_PATTERN = re.compile(r'-?[0-9]+\.[0-9]+')
+
+LITERAL_CACHE_SIZE = 256
+
+
+class InvalidCommand(ValueError):
+    """Error to indicate a command would be rejected by the vacuum."""
+
+
+SCALAR_TYPES = (bool, int, float, str, type(None))
+
+
+class _FrozenDict(dict):
+    """Read-only dict, so parsed objects can be cached and still serialized."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Parsed command parameters are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def _freeze(value):
+    """Return value with lists as tuples and dicts read-only, rejecting non-JSON types."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        if not all(isinstance(key, SCALAR_TYPES) for key in value):
+            raise InvalidCommand(f"Unsupported parameter value: {value!r}")
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, SCALAR_TYPES):
+        return value
+    raise InvalidCommand(f"Unsupported parameter value: {value!r}")
+
+
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def parse_literal(text):
+    """Parse a JSON or Python literal rendered by a template.
+
+    The result is frozen into tuples and read-only dicts so it can be
+    shared between calls; miio serializes both as JSON.
+    """
+    try:
+        value = json.loads(text)
+    except (ValueError, RecursionError):
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError) as exc:
+            raise InvalidCommand(f"Malformed parameter: {text!r}") from exc
+    return _freeze(value)
+
+
+def _parse_param(param):
+    """Parse a single parameter if it is a rendered list or number."""
+    if not isinstance(param, str):
+        return param
+    if param.startswith(LIST_PREFIX):
+        return parse_literal(param)
+    if INT_PATTERN.fullmatch(param):
+        return int(param)
+    if FLOAT_PATTERN.fullmatch(param):
+        return float(param)
+    return param
+
+
+def parse_params(command, params):
+    """Turn template-rendered parameters into values and validate them.
+
+    Home Assistant templating always returns strings, so a list rendered
+    as "[1, 2, 3]" or a number rendered as "1" is parsed back here. A
+    single rendered list is expanded to be the parameter list itself.
+    """
+    if isinstance(params, str):
+        params = [params]
+    if isinstance(params, (list, tuple)):
+        params = [_parse_param(param) for param in params]
+        if len(params) == 1 and isinstance(params[0], tuple):
+            params = list(params[0])
+
+    arity = COMMAND_ARITIES.get(command)
+    if arity is not None:
+        minimum, maximum = arity
+        count = len(params) if isinstance(params, list) else 0
+        if count < minimum or (maximum is not None and count > maximum):
+            expected = minimum if minimum == maximum else f"{minimum} to {maximum or 'any number of'}"
+            raise InvalidCommand(f"{command} takes {expected} parameters, got {count}")
+    return params
@@ -0,0 +1,84 @@
+"""State-transition events for the Xiaomi vacuum."""
+from homeassistant.components.vacuum import VacuumActivity
+
+from .const import DOMAIN
+
+TRIGGER_CLEANING_FINISHED = "cleaning_finished"
+TRIGGER_ERROR = "error"
+TRIGGER_MOP_TANK_REMOVED = "mop_tank_removed"
+TRIGGER_MOP_REMOVED = "mop_removed"
+TRIGGER_BATTERY_FULL = "battery_full"
+TRIGGER_CONSUMABLE_LOW = "consumable_low"
+
+TRIGGER_TYPES = (
+    TRIGGER_CLEANING_FINISHED,
+    TRIGGER_ERROR,
+    TRIGGER_MOP_TANK_REMOVED,
+    TRIGGER_MOP_REMOVED,
+    TRIGGER_BATTERY_FULL,
+    TRIGGER_CONSUMABLE_LOW,
+)
+
+# Each trigger type is fired on the bus as viomise_<type>
+TRIGGER_TO_EVENT = {trigger: f"{DOMAIN}_{trigger}" for trigger in TRIGGER_TYPES}
+
+ATTR_ERROR_CODE = "error_code"
+ATTR_BOX_TYPE = "box_type"
+ATTR_CONSUMABLE = "consumable"
+ATTR_LIFE = "life"
+
+CLEANING_ACTIVITIES = (VacuumActivity.CLEANING, VacuumActivity.PAUSED)
+
+# err_state codes 500-999 are faults; 0 and 21xx report sleep and charging
+ERROR_CODES = range(500, 1000)
+
+# 3: 2 in 1, 2: water only, 1: dust only, 0: no box
+WATER_BOX_TYPES = (2, 3)
+
+CONSUMABLE_PROPS = (
+    "main_brush_life",
+    "side_brush_life",
+    "hypa_life",
+    "mop_life",
+)
+CONSUMABLE_LOW_THRESHOLD = 10
+
+BATTERY_FULL = 100
+
+
+def diff_snapshots(previous, current):
+    """Return the (trigger type, event data) transitions between two polls."""
+    old = previous.state
+    new = current.state
+    transitions = []
+
+    if (
+        previous.activity in CLEANING_ACTIVITIES
+        and current.activity is not None
+        and current.activity not in CLEANING_ACTIVITIES
+    ):
+        transitions.append((TRIGGER_CLEANING_FINISHED, {}))
+
+    if new['err_state'] != old['err_state'] and new['err_state'] in ERROR_CODES:
+        transitions.append((TRIGGER_ERROR, {ATTR_ERROR_CODE: new['err_state']}))
+
+    old_box_type = int(old['box_type'])
+    new_box_type = int(new['box_type'])
+    if old_box_type in WATER_BOX_TYPES and new_box_type not in WATER_BOX_TYPES:
+        transitions.append((TRIGGER_MOP_TANK_REMOVED, {ATTR_BOX_TYPE: new_box_type}))
+
+    if old['mop_type'] and not new['mop_type']:
+        transitions.append((TRIGGER_MOP_REMOVED, {}))
+
+    if old['battary_life'] != BATTERY_FULL and new['battary_life'] == BATTERY_FULL:
+        transitions.append((TRIGGER_BATTERY_FULL, {}))
+
+    for prop in CONSUMABLE_PROPS:
+        if old[prop] == new[prop] or new[prop] is None or old[prop] is None:
+            continue
+        if old[prop] >= CONSUMABLE_LOW_THRESHOLD > new[prop]:
+            transitions.append(
+                (TRIGGER_CONSUMABLE_LOW, {ATTR_CONSUMABLE: prop, ATTR_LIFE: new[prop]})
+            )
+
+    return transitions
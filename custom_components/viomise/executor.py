@@ -0,0 +1,84 @@
+"""Dedicated executor for blocking miio device I/O."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# One worker per device: the miio Device object is not thread-safe, so all
+# calls for a robot are serialized on its own thread instead of Home
+# Assistant's shared pool.
+DEVICE_EXECUTOR_WORKERS = 1
+
+
+class DeviceExecutor:
+    """Single-threaded executor for one vacuum with queue metrics."""
+
+    def __init__(self, name):
+        """Initialize the executor for the named device."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=DEVICE_EXECUTOR_WORKERS,
+            thread_name_prefix=f"viomise-{name}",
+        )
+        self._lock = threading.Lock()
+        self._queue_depth = 0
+        self._peak_queue_depth = 0
+        self._last_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @property
+    def last_wait_time(self):
+        """Return how long the last job waited for the device, in seconds."""
+        return self._last_wait_time
+
+    @property
+    def max_wait_time(self):
+        """Return the longest time a job waited for the device, in seconds."""
+        return self._max_wait_time
+
+    def take_peak_queue_depth(self):
+        """Return the most jobs any call had ahead of it since the last take."""
+        with self._lock:
+            peak = self._peak_queue_depth
+            self._peak_queue_depth = 0
+        return peak
+
+    def _run(self, submitted, func):
+        """Run a job on the device thread, recording its queue wait time."""
+        wait_time = time.monotonic() - submitted
+        self._last_wait_time = wait_time
+        if wait_time > self._max_wait_time:
+            self._max_wait_time = wait_time
+        return func()
+
+    def _job_done(self, future):
+        """Release the queue slot of a job that ran or was cancelled."""
+        with self._lock:
+            self._queue_depth -= 1
+
+    async def async_add_job(self, hass, func, *args, **kwargs):
+        """Run a blocking call on the device thread and await its result."""
+        with self._lock:
+            # Jobs already queued or running are what this call has to wait for
+            if self._queue_depth > self._peak_queue_depth:
+                self._peak_queue_depth = self._queue_depth
+            self._queue_depth += 1
+        try:
+            future = self._executor.submit(
+                partial(self._run, time.monotonic(), partial(func, *args, **kwargs))
+            )
+        except RuntimeError:
+            # The executor is shut down, so the job will never be released
+            self._job_done(None)
+            raise
+        # Done callbacks also run for jobs cancelled before they started
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future, loop=hass.loop)
+
+    def shutdown(self):
+        """Wait for in-flight device calls and stop the worker thread."""
+        _LOGGER.debug("Shutting down device executor")
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,167 @@
+"""Queue of cleaning jobs run one after another on the Xiaomi vacuum."""
+import asyncio
+import logging
+import time
+
+from homeassistant.components.vacuum import VacuumActivity
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.job_queue"
+
+ATTR_JOB_TYPE = "type"
+JOB_SEGMENT = "segment"
+JOB_ZONE = "zone"
+JOB_POINT = "point"
+JOB_GOTO = "goto"
+JOB_DOCK = "dock"
+
+# Seconds to wait for a started job to show up in run_state before skipping it
+JOB_START_TIMEOUT = 120
+# Seconds to wait for a dock job to reach the dock before moving on
+JOB_DOCK_TIMEOUT = 600
+
+BUSY_ACTIVITIES = (VacuumActivity.CLEANING, VacuumActivity.PAUSED)
+
+
+class CleaningJobQueue:
+    """Start queued jobs as soon as the poll shows the previous one finished."""
+
+    def __init__(self, start_job):
+        """Initialize the queue with the coroutine that starts a job."""
+        self._start_job = start_job
+        self._store = None
+        self._lock = asyncio.Lock()
+        self._jobs = []
+        self._current = None
+        self._started = False
+        self._start_deadline = None
+        self._baseline = None
+        self._version = None
+        self._revision = 0
+
+    @property
+    def revision(self):
+        """Return a counter that changes whenever the queue changes."""
+        return self._revision
+
+    @property
+    def attributes(self):
+        """Return the queue state as vacuum state attributes."""
+        return {
+            "job_queue_current": self._current[ATTR_JOB_TYPE] if self._current else None,
+            "job_queue_pending": len(self._jobs),
+        }
+
+    async def async_load(self, hass, entry_id):
+        """Restore the queue persisted before the last restart."""
+        self._store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry_id}")
+        if (data := await self._store.async_load()) is None:
+            return
+        self._jobs = data["jobs"]
+        self._current = data["current"]
+        self._started = data["started"]
+        if (baseline := data.get("baseline")) is not None:
+            self._baseline = tuple(baseline)
+        if self._current is not None:
+            self._start_deadline = time.monotonic() + self._job_timeout(self._current)
+
+    def _async_save(self):
+        """Persist the queue, batching writes made in quick succession."""
+        # Every change to the queue is saved, so this is where it is counted
+        self._revision += 1
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, 1)
+
+    def _data_to_save(self):
+        """Return the queue in its storage format."""
+        return {
+            "jobs": self._jobs,
+            "current": self._current,
+            "started": self._started,
+            "baseline": self._baseline,
+        }
+
+    async def async_enqueue(self, jobs, snapshot):
+        """Append jobs to the queue, starting the first one if idle."""
+        async with self._lock:
+            self._jobs.extend(jobs)
+            if self._current is None:
+                await self._async_start_next(snapshot)
+            self._async_save()
+
+    async def async_cancel(self):
+        """Drop all queued jobs; a running job is left to finish."""
+        async with self._lock:
+            self._jobs.clear()
+            self._current = None
+            self._started = False
+            self._async_save()
+
+    async def async_process(self, snapshot):
+        """Advance the queue based on a new poll of the vacuum."""
+        if snapshot is None or snapshot.version == self._version:
+            return
+        self._version = snapshot.version
+        async with self._lock:
+            if self._current is None or not self._job_finished(snapshot):
+                return
+            await self._async_start_next(snapshot)
+            self._async_save()
+
+    @staticmethod
+    def _job_timeout(job):
+        """Return how long a job may go without being seen running."""
+        return JOB_DOCK_TIMEOUT if job[ATTR_JOB_TYPE] == JOB_DOCK else JOB_START_TIMEOUT
+
+    @staticmethod
+    def _run_state_and_mode(snapshot):
+        """Return the run_state and mode of a poll, or None before the first poll."""
+        if snapshot is None:
+            return None
+        return (snapshot.state['run_state'], snapshot.state['mode'])
+
+    def _job_finished(self, snapshot):
+        """Return True once the current job is done or failed to start."""
+        activity = snapshot.activity
+        if activity is None:
+            # An unknown run_state says nothing about the job
+            finished = False
+        elif self._current[ATTR_JOB_TYPE] == JOB_DOCK:
+            finished = activity == VacuumActivity.DOCKED
+        elif activity in BUSY_ACTIVITIES:
+            if not self._started:
+                self._started = True
+                self._async_save()
+            return False
+        else:
+            # A job short enough to start and end between two polls is only
+            # visible as a change of run_state or mode since it was started
+            finished = self._started or (
+                self._baseline is not None
+                and self._run_state_and_mode(snapshot) != self._baseline
+            )
+        if finished:
+            return True
+        if self._started or time.monotonic() < self._start_deadline:
+            return False
+        _LOGGER.warning("Queued job %s did not run, skipping it", self._current)
+        return True
+
+    async def _async_start_next(self, snapshot):
+        """Start the next queued job, skipping any the vacuum rejects."""
+        self._current = None
+        self._started = False
+        self._baseline = None
+        while self._jobs:
+            job = self._jobs.pop(0)
+            if await self._start_job(job):
+                self._current = job
+                self._baseline = self._run_state_and_mode(snapshot)
+                self._start_deadline = time.monotonic() + self._job_timeout(job)
+                return
+            _LOGGER.error("Unable to start queued job %s, skipping it", job)
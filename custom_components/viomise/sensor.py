@@ -3,7 +3,7 @@ from homeassistant.components.sensor import (
     SensorEntity,
     SensorStateClass,
 )
-from homeassistant.const import PERCENTAGE
+from homeassistant.const import PERCENTAGE, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -18,7 +18,15 @@ async def async_setup_entry(
     """Set up the Xiaomi vacuum battery sensor."""
     try:
         vacuum = hass.data[DOMAIN][config_entry.entry_id]
-        async_add_entities([XiaomiVacuumBatterySensor(vacuum)], True)
+        async_add_entities(
+            [
+                XiaomiVacuumBatterySensor(vacuum),
+                XiaomiVacuumQueueDepthSensor(vacuum),
+                XiaomiVacuumQueueWaitSensor(vacuum),
+                XiaomiVacuumMaxQueueWaitSensor(vacuum),
+            ],
+            True,
+        )
     except KeyError:
         return
 
@@ -53,51 +61,99 @@ class XiaomiVacuumBatterySensor(SensorEntity):
     @property
     def native_value(self):
         """Return the battery level of the vacuum cleaner."""
-        if hasattr(self._vacuum, 'vacuum_state') and self._vacuum.vacuum_state is not None:
-            return self._vacuum.vacuum_state.get('battary_life')  # Using the raw property name
+        if self._vacuum.snapshot is not None:
+            return self._vacuum.snapshot.state.get('battary_life')  # Using the raw property name
         return None
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes of the sensor."""
-        attributes = {}
-        if hasattr(self._vacuum, 'vacuum_state') and isinstance(self._vacuum.vacuum_state, dict):
-            # Convert the is_charge value to a boolean (0 means charging, 1 means not charging)
-            is_charge_value = self._vacuum.vacuum_state.get('is_charge')
-            if is_charge_value is not None:
-                attributes['is_charging'] = is_charge_value == 0
-        return attributes
+        if self._vacuum.snapshot is not None:
+            return self._vacuum.snapshot.battery_attributes
+        return {}
 
     @property
     def icon(self):
         """Return the icon of the sensor."""
-        charging = self.extra_state_attributes.get('is_charging', False)
-        battery_level = self.native_value
-
-        if battery_level is None:
+        if self._vacuum.snapshot is None:
             return 'mdi:battery-unknown'
-        
-        if charging:
-            if battery_level >= 99:
-                return 'mdi:battery-charging'
-            elif battery_level >= 90:
-                return 'mdi:battery-charging-100'
-            elif battery_level >= 60:
-                return 'mdi:battery-charging-70'
-            elif battery_level >= 40:
-                return 'mdi:battery-charging-50'
-            elif battery_level >= 20:
-                return 'mdi:battery-charging-30'
-            else:
-                return 'mdi:battery-charging-10'
-        else:
-            if battery_level >= 90:
-                return 'mdi:battery'
-            elif battery_level >= 60:
-                return 'mdi:battery-70'
-            elif battery_level >= 40:
-                return 'mdi:battery-50'
-            elif battery_level >= 20:
-                return 'mdi:battery-30'
-            else:
-                return 'mdi:battery-10'
+        return self._vacuum.snapshot.battery_icon
+
+
+class XiaomiVacuumExecutorSensor(SensorEntity):
+    """Base for sensors reporting the vacuum's device executor metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = False  # Sampled whenever the vacuum updates
+
+    def __init__(self, vacuum, key, name):
+        """Initialize the sensor."""
+        self._vacuum = vacuum
+        self._attr_unique_id = f"{vacuum.unique_id}_{key}"
+        self._attr_name = f"{vacuum.name} {name}"
+        self._attr_device_info = vacuum.device_info
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        self._vacuum.register_callback(self.update_callback)
+        self.async_on_remove(
+            lambda: self._vacuum.remove_callback(self.update_callback)
+        )
+
+    @callback
+    def update_callback(self):
+        """Sample the executor when the vacuum updates its state."""
+        self._attr_native_value = self._sample(self._vacuum.executor)
+        self.async_write_ha_state()
+
+    def _sample(self, executor):
+        """Return the current value of the metric."""
+        raise NotImplementedError
+
+
+class XiaomiVacuumQueueDepthSensor(XiaomiVacuumExecutorSensor):
+    """Most device calls waiting ahead of another call since the last update."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, vacuum):
+        """Initialize the sensor."""
+        super().__init__(vacuum, "queue_depth", "Device queue depth")
+
+    def _sample(self, executor):
+        """Return the peak queue depth since the previous sample."""
+        return executor.take_peak_queue_depth()
+
+
+class XiaomiVacuumQueueWaitSensor(XiaomiVacuumExecutorSensor):
+    """Time the latest device call waited for the device thread."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 3
+
+    def __init__(self, vacuum):
+        """Initialize the sensor."""
+        super().__init__(vacuum, "queue_wait", "Device queue wait")
+
+    def _sample(self, executor):
+        """Return the wait time of the latest call."""
+        return round(executor.last_wait_time, 3)
+
+
+class XiaomiVacuumMaxQueueWaitSensor(XiaomiVacuumExecutorSensor):
+    """Longest time any device call waited for the device thread."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 3
+
+    def __init__(self, vacuum):
+        """Initialize the sensor."""
+        super().__init__(vacuum, "max_queue_wait", "Device max queue wait")
+
+    def _sample(self, executor):
+        """Return the longest wait time seen so far."""
+        return round(executor.max_wait_time, 3)
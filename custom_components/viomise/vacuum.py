@@ -1,6 +1,7 @@
 """Support for the Xiaomi vacuum cleaner robot."""
 import asyncio
-from functools import partial
+from bisect import bisect_right
+from functools import cached_property
 import logging
 
 from miio import ViomiVacuum, DeviceException # pylint: disable=import-error
@@ -14,6 +15,7 @@ from homeassistant.components.vacuum import (
 )
 
 from homeassistant.const import (
+    ATTR_DEVICE_ID,
     ATTR_ENTITY_ID,
     CONF_HOST,
     CONF_NAME,
@@ -23,7 +25,19 @@ from homeassistant.const import (
     Platform,
 )
 
+from .commands import InvalidCommand, parse_params
 from .const import DOMAIN, DATA_KEY
+from .events import TRIGGER_TO_EVENT, diff_snapshots
+from .executor import DeviceExecutor
+from .job_queue import (
+    ATTR_JOB_TYPE,
+    JOB_DOCK,
+    JOB_GOTO,
+    JOB_POINT,
+    JOB_SEGMENT,
+    JOB_ZONE,
+    CleaningJobQueue,
+)
 
 from homeassistant.helpers import entity
 from homeassistant.helpers import config_validation as cv
@@ -51,25 +65,39 @@ SERVICE_GOTO = "vacuum_goto"
 SERVICE_CLEAN_SEGMENT = "vacuum_clean_segment"
 SERVICE_OBS_CLEAN_ZONE = "xiaomi_clean_zone"
 SERVICE_CLEAN_POINT = "xiaomi_clean_point"
+SERVICE_QUEUE_JOBS = "vacuum_queue_jobs"
+SERVICE_CANCEL_QUEUE = "vacuum_cancel_queue"
 ATTR_ZONE_ARRAY = "zone"
 ATTR_ZONE_REPEATER = "repeats"
 ATTR_X_COORD = "x_coord"
 ATTR_Y_COORD = "y_coord"
 ATTR_SEGMENTS = "segments"
 ATTR_POINT = "point"
+ATTR_JOBS = "jobs"
+ZONE_ARRAY_VALIDATOR = vol.All(
+    list,
+    [
+        vol.ExactSequence(
+            [vol.Coerce(float), vol.Coerce(float), vol.Coerce(float), vol.Coerce(float)]
+        )
+    ],
+)
+ZONE_REPEATER_VALIDATOR = vol.All(
+    vol.Coerce(int), vol.Clamp(min=1, max=3)
+)
+SEGMENTS_VALIDATOR = vol.Any(
+    vol.Coerce(int),
+    [vol.Coerce(int)]
+)
+POINT_VALIDATOR = vol.All(
+    vol.ExactSequence(
+        [vol.Coerce(float), vol.Coerce(float)]
+    )
+)
 SERVICE_SCHEMA_CLEAN_ZONE = VACUUM_SERVICE_SCHEMA.extend(
     {
-        vol.Required(ATTR_ZONE_ARRAY): vol.All(
-            list,
-            [
-                vol.ExactSequence(
-                    [vol.Coerce(float), vol.Coerce(float), vol.Coerce(float), vol.Coerce(float)]
-                )
-            ],
-        ),
-        vol.Required(ATTR_ZONE_REPEATER): vol.All(
-            vol.Coerce(int), vol.Clamp(min=1, max=3)
-        ),
+        vol.Required(ATTR_ZONE_ARRAY): ZONE_ARRAY_VALIDATOR,
+        vol.Required(ATTR_ZONE_REPEATER): ZONE_REPEATER_VALIDATOR,
     }
 )
 SERVICE_SCHEMA_GOTO = VACUUM_SERVICE_SCHEMA.extend(
@@ -80,19 +108,46 @@ SERVICE_SCHEMA_GOTO = VACUUM_SERVICE_SCHEMA.extend(
 )
 SERVICE_SCHEMA_CLEAN_SEGMENT = VACUUM_SERVICE_SCHEMA.extend(
     {
-        vol.Required(ATTR_SEGMENTS): vol.Any(
-            vol.Coerce(int),
-            [vol.Coerce(int)]
-        ),
+        vol.Required(ATTR_SEGMENTS): SEGMENTS_VALIDATOR,
     }
 )
 SERVICE_SCHEMA_CLEAN_POINT = VACUUM_SERVICE_SCHEMA.extend(
     {
-        vol.Required(ATTR_POINT): vol.All(
-            vol.ExactSequence(
-                [vol.Coerce(float), vol.Coerce(float)]
-            )
-        )
+        vol.Required(ATTR_POINT): POINT_VALIDATOR,
+    }
+)
+JOB_SCHEMA = vol.Any(
+    vol.Schema(
+        {
+            vol.Required(ATTR_JOB_TYPE): JOB_SEGMENT,
+            vol.Required(ATTR_SEGMENTS): SEGMENTS_VALIDATOR,
+        }
+    ),
+    vol.Schema(
+        {
+            vol.Required(ATTR_JOB_TYPE): JOB_ZONE,
+            vol.Required(ATTR_ZONE_ARRAY): ZONE_ARRAY_VALIDATOR,
+            vol.Optional(ATTR_ZONE_REPEATER, default=1): ZONE_REPEATER_VALIDATOR,
+        }
+    ),
+    vol.Schema(
+        {
+            vol.Required(ATTR_JOB_TYPE): JOB_POINT,
+            vol.Required(ATTR_POINT): POINT_VALIDATOR,
+        }
+    ),
+    vol.Schema(
+        {
+            vol.Required(ATTR_JOB_TYPE): JOB_GOTO,
+            vol.Required(ATTR_X_COORD): vol.Coerce(float),
+            vol.Required(ATTR_Y_COORD): vol.Coerce(float),
+        }
+    ),
+    vol.Schema({vol.Required(ATTR_JOB_TYPE): JOB_DOCK}),
+)
+SERVICE_SCHEMA_QUEUE_JOBS = VACUUM_SERVICE_SCHEMA.extend(
+    {
+        vol.Required(ATTR_JOBS): vol.All(cv.ensure_list, vol.Length(min=1), [JOB_SCHEMA]),
     }
 )
 SERVICE_TO_METHOD = {
@@ -115,10 +170,27 @@ SERVICE_TO_METHOD = {
     SERVICE_CLEAN_POINT: {
         "method": "async_clean_point",
         "schema": SERVICE_SCHEMA_CLEAN_POINT,
-    }
+    },
+    SERVICE_QUEUE_JOBS: {
+        "method": "async_queue_jobs",
+        "schema": SERVICE_SCHEMA_QUEUE_JOBS,
+    },
+    SERVICE_CANCEL_QUEUE: {
+        "method": "async_cancel_queue",
+    },
+}
+
+JOB_TO_METHOD = {
+    JOB_SEGMENT: "async_clean_segment",
+    JOB_ZONE: "async_clean_zone",
+    JOB_POINT: "async_clean_point",
+    JOB_GOTO: "async_goto",
+    JOB_DOCK: "async_return_to_base",
 }
 
 FAN_SPEEDS = {"Silent": 0, "Standard": 1, "Medium": 2, "Turbo": 3}
+FAN_SPEED_NAMES = {value: key for key, value in FAN_SPEEDS.items()}
+FAN_SPEED_LIST = sorted(FAN_SPEEDS, key=FAN_SPEEDS.get)
 
 
 SUPPORT_XIAOMI = (
@@ -145,6 +217,25 @@ STATE_CODE_TO_STATE = {
     7: VacuumActivity.CLEANING   # Changed from STATE_CLEANING
 }
 
+# Lower bounds of each battery icon step, indexed with bisect_right
+BATTERY_ICON_THRESHOLDS = (20, 40, 60, 90, 99)
+BATTERY_ICONS_CHARGING = (
+    'mdi:battery-charging-10',
+    'mdi:battery-charging-30',
+    'mdi:battery-charging-50',
+    'mdi:battery-charging-70',
+    'mdi:battery-charging-100',
+    'mdi:battery-charging',
+)
+BATTERY_ICONS_DISCHARGING = (
+    'mdi:battery-10',
+    'mdi:battery-30',
+    'mdi:battery-50',
+    'mdi:battery-70',
+    'mdi:battery',
+    'mdi:battery',
+)
+
 ALL_PROPS = [
     "run_state",
     "mode",
@@ -194,6 +285,66 @@ VACUUM_CARD_PROPS_REFERENCES = {
     'battery': 'battary_life'  # Add mapping from correct name to misspelled property
 }
 
+class VacuumSnapshot:
+    """State of one poll, with derived values computed once per version."""
+
+    def __init__(self, version, state):
+        """Initialize the snapshot from the polled state dictionary."""
+        self.version = version
+        self.state = state
+
+    @cached_property
+    def activity(self):
+        """Return the vacuum activity for the polled run_state."""
+        try:
+            return STATE_CODE_TO_STATE[int(self.state['run_state'])]
+        except KeyError:
+            _LOGGER.error(
+                "STATE not supported, state_code: %s",
+                self.state['run_state'],
+            )
+            return None
+
+    @cached_property
+    def fan_speed(self):
+        """Return the fan speed name, or the raw suction grade if unknown."""
+        speed = self.state['suction_grade']
+        return FAN_SPEED_NAMES.get(speed, speed)
+
+    @cached_property
+    def is_charging(self):
+        """Return True if charging, None if the device did not report it."""
+        # is_charge is 0 while charging and 1 while not charging
+        is_charge_value = self.state.get('is_charge')
+        if is_charge_value is None:
+            return None
+        return is_charge_value == 0
+
+    @cached_property
+    def battery_icon(self):
+        """Return the battery sensor icon for the polled battery level."""
+        battery_level = self.state.get('battary_life')
+        if battery_level is None:
+            return 'mdi:battery-unknown'
+        icons = BATTERY_ICONS_CHARGING if self.is_charging else BATTERY_ICONS_DISCHARGING
+        return icons[bisect_right(BATTERY_ICON_THRESHOLDS, battery_level)]
+
+    @cached_property
+    def battery_attributes(self):
+        """Return the state attributes of the battery sensor."""
+        if self.is_charging is None:
+            return {}
+        return {'is_charging': self.is_charging}
+
+    @cached_property
+    def attributes(self):
+        """Return the state attributes of the vacuum entity."""
+        attrs = dict(self.state)
+        if self.activity is not None:
+            attrs['status'] = self.activity
+        return attrs
+
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Xiaomi vacuum platform from config entry."""
     host = config_entry.data[CONF_HOST]
@@ -201,7 +352,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     name = config_entry.data[CONF_NAME]
 
     vacuum = ViomiVacuum(host, token)
-    mirobo = MiroboVacuum2(name, vacuum)
+    mirobo = MiroboVacuum2(name, vacuum, DeviceExecutor(host))
+    await mirobo.job_queue.async_load(hass, config_entry.entry_id)
     
     hass.data.setdefault(DATA_KEY, {})
     hass.data[DATA_KEY][host] = mirobo
@@ -259,13 +411,20 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class MiroboVacuum2(StateVacuumEntity):
     """Representation of a Xiaomi Vacuum cleaner robot."""
 
-    def __init__(self, name, vacuum):
+    def __init__(self, name, vacuum, executor):
         """Initialize the Xiaomi vacuum cleaner robot handler."""
         self._name = name
         self._vacuum = vacuum
+        self.executor = executor
+        self.job_queue = CleaningJobQueue(self.async_start_job)
         self._unique_id = f"{vacuum.ip}-{vacuum.token}"
         self._last_clean_point = None
         self.vacuum_state = None
+        self.snapshot = None
+        self._previous_snapshot = None
+        self._version = 0
+        self._attributes = {}
+        self._attributes_key = None
         self._available = False
         self._callbacks = set()
 
@@ -279,10 +438,33 @@ class MiroboVacuum2(StateVacuumEntity):
 
     async def async_update(self):
         """Update the vacuum state and notify listeners."""
-        await self.hass.async_add_executor_job(self.update)
+        await self.executor.async_add_job(self.hass, self.update)
+        await self.job_queue.async_process(self.snapshot)
+        self._async_fire_transition_events()
         for callback in self._callbacks:
             callback()
 
+    def _async_fire_transition_events(self):
+        """Fire an event for each transition since the previous poll."""
+        previous, current = self._previous_snapshot, self.snapshot
+        if current is None or current is previous:
+            return
+        self._previous_snapshot = current
+        if previous is None:
+            return
+        device_id = self.registry_entry.device_id if self.registry_entry else None
+        for trigger_type, data in diff_snapshots(previous, current):
+            self.hass.bus.async_fire(
+                TRIGGER_TO_EVENT[trigger_type],
+                {ATTR_DEVICE_ID: device_id, ATTR_ENTITY_ID: self.entity_id, **data},
+            )
+
+    async def async_will_remove_from_hass(self):
+        """Stop routing services to the vacuum once it is removed."""
+        vacuums = self.hass.data.get(DATA_KEY, {})
+        if vacuums.get(self._vacuum.ip) is self:
+            vacuums.pop(self._vacuum.ip)
+
     @property
     def unique_id(self) -> str:
         """Return a unique ID."""
@@ -306,15 +488,8 @@ class MiroboVacuum2(StateVacuumEntity):
     @property
     def activity(self):
         """Return the current vacuum activity as a VacuumActivity enum."""
-        if self.vacuum_state is not None:
-            try:
-                return STATE_CODE_TO_STATE[int(self.vacuum_state['run_state'])]
-            except KeyError:
-                _LOGGER.error(
-                    "STATE not supported, state_code: %s",
-                    self.vacuum_state['run_state'],
-                )
-                return None
+        if self.snapshot is not None:
+            return self.snapshot.activity
         return None
 
 #    @property
@@ -340,38 +515,25 @@ class MiroboVacuum2(StateVacuumEntity):
     @property
     def fan_speed(self):
         """Return the fan speed of the vacuum cleaner."""
-        if self.vacuum_state is not None:
-            speed = self.vacuum_state['suction_grade']
-            if speed in FAN_SPEEDS.values():
-                return [
-                    key for key,
-                    value in FAN_SPEEDS.items() if value == speed][0]
-            return speed
+        if self.snapshot is not None:
+            return self.snapshot.fan_speed
 
     @property
     def fan_speed_list(self):
         """Get the list of available fan speed steps of the vacuum cleaner."""
-        return list(sorted(FAN_SPEEDS.keys(), key=lambda s: FAN_SPEEDS[s]))
+        return FAN_SPEED_LIST
 
     @property
     def extra_state_attributes(self):
         """Return the specific state attributes of this vacuum cleaner."""
-        attrs = {}
-        if self.vacuum_state is not None:
-            # Create a copy of the state dictionary to avoid modifying the original
-            state_copy = dict(self.vacuum_state)
-            
-            # Add the proper "battery" attribute while preserving the original "battary_life"
-            # if 'battary_life' in state_copy:
-            #    state_copy['battery'] = state_copy['battary_life']
-            
-            attrs.update(state_copy)
-            try:
-                attrs['status'] = STATE_CODE_TO_STATE[int(
-                    self.vacuum_state['run_state'])]
-            except KeyError:
-                return "Definition missing for state %s" % self.vacuum_state['run_state']
-        return attrs
+        if self.snapshot is None:
+            return {}
+        # The job queue can change between polls, so it is part of the cache key
+        key = (self.snapshot.version, self.job_queue.revision)
+        if key != self._attributes_key:
+            self._attributes = {**self.snapshot.attributes, **self.job_queue.attributes}
+            self._attributes_key = key
+        return self._attributes
 
     @property
     def available(self) -> bool:
@@ -386,7 +548,7 @@ class MiroboVacuum2(StateVacuumEntity):
     async def _try_command(self, mask_error, func, *args, **kwargs):
         """Call a vacuum command handling error messages."""
         try:
-            await self.hass.async_add_executor_job(partial(func, *args, **kwargs))
+            await self.executor.async_add_job(self.hass, func, *args, **kwargs)
             return True
         except DeviceException as exc:
             _LOGGER.error(mask_error, exc)
@@ -476,21 +638,19 @@ class MiroboVacuum2(StateVacuumEntity):
 
     async def async_return_to_base(self, **kwargs):
         """Set the vacuum cleaner to return to the dock."""
-        await self._try_command("Unable to return home: %s", self._vacuum.raw_command, 'set_charge', [1])
+        return await self._try_command("Unable to return home: %s", self._vacuum.raw_command, 'set_charge', [1])
 
     async def async_locate(self, **kwargs):
         """Locate the vacuum cleaner."""
         await self._try_command("Unable to locate the botvac: %s", self._vacuum.raw_command, 'set_resetpos', [1])
 
     async def async_send_command(self, command, params=None, **kwargs):
-        # Home Assistant templating always returns a string, even if array is outputted, fix this so we can use templating in scripts.
-        if isinstance(params, list) and len(params) == 1 and isinstance(params[0], str):
-            if params[0].find('[') > -1 and params[0].find(']') > -1:
-                params = eval(params[0])
-            elif params[0].isnumeric():
-                params[0] = int(params[0])
-
         """Send raw command."""
+        try:
+            params = parse_params(command, params)
+        except InvalidCommand as exc:
+            _LOGGER.error("Unable to send command to the vacuum: %s", exc)
+            return
         await self._try_command(
             "Unable to send command to the vacuum: %s",
             self._vacuum.raw_command,
@@ -509,6 +669,9 @@ class MiroboVacuum2(StateVacuumEntity):
             for prop in VACUUM_CARD_PROPS_REFERENCES.keys():
                 self.vacuum_state[prop] = self.vacuum_state[VACUUM_CARD_PROPS_REFERENCES[prop]]
 
+            self._version += 1
+            self.snapshot = VacuumSnapshot(self._version, self.vacuum_state)
+
             self._available = True
 
             # Current state of the vacuum
@@ -561,14 +724,14 @@ class MiroboVacuum2(StateVacuumEntity):
                 i += 1
         result = [i] + result
 
-        await self._try_command("Unable to clean zone: %s", self._vacuum.raw_command, 'set_uploadmap', [1]) \
+        return await self._try_command("Unable to clean zone: %s", self._vacuum.raw_command, 'set_uploadmap', [1]) \
             and await self._try_command("Unable to clean zone: %s", self._vacuum.raw_command, 'set_zone', result) \
             and await self._try_command("Unable to clean zone: %s", self._vacuum.raw_command, 'set_mode', [3, 1])
 
     async def async_goto(self, x_coord, y_coord):
         """Clean area around the specified coordinates"""
         self._last_clean_point = [x_coord, y_coord]
-        await self._try_command("Unable to goto: %s", self._vacuum.raw_command, 'set_uploadmap', [0]) \
+        return await self._try_command("Unable to goto: %s", self._vacuum.raw_command, 'set_uploadmap', [0]) \
             and await self._try_command("Unable to goto: %s", self._vacuum.raw_command, 'set_pointclean', [1, x_coord, y_coord])
 
     async def async_clean_segment(self, segments):
@@ -576,12 +739,25 @@ class MiroboVacuum2(StateVacuumEntity):
         if isinstance(segments, int):
             segments = [segments]
 
-        await self._try_command("Unable to clean segments: %s", self._vacuum.raw_command, 'set_uploadmap', [1]) \
+        return await self._try_command("Unable to clean segments: %s", self._vacuum.raw_command, 'set_uploadmap', [1]) \
             and await self._try_command("Unable to clean segments: %s", self._vacuum.raw_command, 'set_mode_withroom', [0, 1, len(segments)] + segments)
 
     async def async_clean_point(self, point):
         """Clean selected area"""
         x, y = point
         self._last_clean_point = point
-        await self._try_command("Unable to clean point: %s", self._vacuum.raw_command, 'set_uploadmap', [0]) \
+        return await self._try_command("Unable to clean point: %s", self._vacuum.raw_command, 'set_uploadmap', [0]) \
             and await self._try_command("Unable to clean point: %s", self._vacuum.raw_command, 'set_pointclean', [1, x, y])
+
+    async def async_start_job(self, job):
+        """Start a queued cleaning job, returning True if the vacuum accepted it."""
+        params = {key: value for key, value in job.items() if key != ATTR_JOB_TYPE}
+        return await getattr(self, JOB_TO_METHOD[job[ATTR_JOB_TYPE]])(**params)
+
+    async def async_queue_jobs(self, jobs):
+        """Add cleaning jobs to run one after another."""
+        await self.job_queue.async_enqueue(jobs, self.snapshot)
+
+    async def async_cancel_queue(self):
+        """Drop the queued cleaning jobs."""
+        await self.job_queue.async_cancel()